@@ -6,11 +6,15 @@ from web3.contract import Contract
 from web3.types import Wei
 from typing import Optional, Tuple
 from src.logging_config import setup_logger
+from src.utils.tracing import rpc_trace_middleware, span, trace_enabled, traced
 logger = setup_logger(__name__)
 
 # 配置日志
 LOG_LEVEL = logging.DEBUG if os.getenv("DEV") == "true" else logging.INFO
 
+# 钱包余额本地估算默认最多覆盖的交易数（每轮挖矿两笔，即每 5 轮查询一次链上余额）
+DEFAULT_BALANCE_REFRESH_TXS = 10
+
 # 合约地址（必须使用校验和格式）
 CONTRACT_ADDRESS = Web3.to_checksum_address('0x51e0ab7f7db4a2bf4500dfa59f7a4957afc8c02e')
 
@@ -79,9 +83,19 @@ class BlockchainClient:
         self.w3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs={'timeout': 30}))
         if not self.w3.is_connected():
             raise ConnectionError("无法连接至RPC节点")
+        if trace_enabled():
+            # 记录每次 RPC 请求，嵌套在调用它的方法 span 内
+            self.w3.middleware_onion.add(rpc_trace_middleware, name="trace")
 
         self.account = self._validate_account(private_key)
         self.contract = self._load_contract()
+
+        # 钱包余额本地估算：上次链上余额减去之后本客户端交易收据中的 Gas 花费
+        # 按已确认交易数刷新（每轮挖矿两笔交易），与出块间隔无关
+        self.balance_refresh_txs = int(os.getenv("BALANCE_REFRESH_TXS") or DEFAULT_BALANCE_REFRESH_TXS)
+        self._balance_base_wei: Optional[int] = None
+        self._estimated_txs = 0
+        self._gas_spent_wei = 0
         logger.info(f"[初始化] 区块链客户端初始化成功，地址: {self.account.address}")
 
     def _validate_account(self, private_key: str):
@@ -115,6 +129,32 @@ class BlockchainClient:
             logger.error(f"[错误] 合约加载失败: {str(e)}")
             raise
 
+    def _reset_balance_estimate(self):
+        """丢弃本地余额估算，下次 get_balance 查询链上余额"""
+        self._balance_base_wei = None
+        self._estimated_txs = 0
+        self._gas_spent_wei = 0
+
+    def _record_receipt(self, receipt):
+        """根据交易收据累计本地余额估算的 Gas 花费"""
+        if self._balance_base_wei is None:
+            return
+
+        gas_price = receipt.get('effectiveGasPrice')
+        if gas_price is None:
+            # 节点未返回实际 Gas 单价，无法准确扣减，改为下次重新查询
+            self._reset_balance_estimate()
+            return
+        self._gas_spent_wei += receipt.gasUsed * gas_price
+        self._estimated_txs += 1
+
+    def _balance_estimate_valid(self) -> bool:
+        """本地余额估算是否还能使用（估算覆盖的交易数未达到 BALANCE_REFRESH_TXS）"""
+        if self._balance_base_wei is None:
+            return False
+        return self._estimated_txs < self.balance_refresh_txs
+
+    @traced()
     def request_mining_task(self) -> Optional[str]:
         """请求新挖矿任务并返回交易哈希"""
         try:
@@ -141,6 +181,7 @@ class BlockchainClient:
             logger.error(f"[错误] 任务请求失败: {str(e)}")
             return None
 
+    @traced()
     def get_mining_task(self, retries: int = 3) -> Optional[Tuple[str, int, bool]]:
         """
         获取当前挖矿任务（带重试机制），使用 web3.to_hex() 处理大整数 nonce
@@ -167,7 +208,8 @@ class BlockchainClient:
                 # 检查是否为空任务
                 if result[0] == 0 and result[1] == 0 and not result[2]:
                     logger.warning(f"[警告] 合约返回空任务，等待重试... 尝试次数: {attempt + 1}/{retries}")
-                    time.sleep(2 ** attempt)
+                    with span("get_mining_task.backoff", attempt=attempt):
+                        time.sleep(2 ** attempt)
                     continue
 
                 # 转换为十六进制字符串 + 显式类型转换
@@ -182,7 +224,8 @@ class BlockchainClient:
                 logger.error(f"[错误] 数据解析失败: {str(ve)}")
                 if attempt == retries - 1:
                     return None
-                time.sleep(2 ** attempt)
+                with span("get_mining_task.backoff", attempt=attempt):
+                    time.sleep(2 ** attempt)
             except Exception as e:
                 logger.error(f"[错误] 获取任务失败: {str(e)}")
                 return None
@@ -190,6 +233,7 @@ class BlockchainClient:
         logger.error("[错误] 最大重试次数已用完，任务获取失败")
         return None
 
+    @traced()
     def submit_solution(self, solution: int) -> Optional[str]:
         """提交解决方案"""
         try:
@@ -227,16 +271,31 @@ class BlockchainClient:
             logger.error(f"[错误] 提交失败: {str(e)}")
             return None
 
-    def get_balance(self) -> float:
-        """获取钱包余额（单位：MAG）"""
+    @traced()
+    def get_balance(self, fresh: bool = False) -> float:
+        """
+        获取钱包余额（单位：MAG）
+
+        估算覆盖的交易未达到 BALANCE_REFRESH_TXS 笔时返回本地估算值：上次链上余额减去之后
+        本客户端已确认交易的 Gas 花费。估算不包含挖矿奖励等转入，也不包含用同一私钥
+        在别处发出的交易，因此可能偏低也可能偏高；等待交易失败时会丢弃估算。
+        fresh=True 时强制查询链上余额。
+        """
         try:
-            balance_wei = self.w3.eth.get_balance(self.account.address)
+            if not fresh and self._balance_estimate_valid():
+                balance_wei = self._balance_base_wei - self._gas_spent_wei
+            else:
+                balance_wei = self.w3.eth.get_balance(self.account.address)
+                self._balance_base_wei = balance_wei
+                self._estimated_txs = 0
+                self._gas_spent_wei = 0
             balance_mag = self.w3.from_wei(balance_wei, 'ether')
             return balance_mag
         except Exception as e:
             logger.error(f"[错误] 余额查询失败: {str(e)}")
             return 0.0
 
+    @traced()
     def get_contract_balance(self) -> float:
         """获取合约池余额（单位：MAG）"""
         try:
@@ -247,17 +306,26 @@ class BlockchainClient:
             logger.error(f"[错误] 合约余额查询失败: {str(e)}")
             return 0.0
 
+    @traced()
     def wait_for_transaction(self, tx_hash: str, timeout=120) -> bool:
         """等待交易确认"""
         try:
             receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash, timeout=timeout)
             logger.debug(f"[调试] 交易收据: {receipt}")
-
-            if receipt.status == 1:
-                logger.info(f"[交易确认] 交易已确认 Block: {receipt.blockNumber}")
-                return True
-            logger.error(f"[交易失败] 交易失败: {receipt.transactionHash.hex()}")
-            return False
         except Exception as e:
             logger.error(f"[错误] 等待交易超时: {str(e)}")
-            return False
\ No newline at end of file
+            # 交易之后仍可能上链并花费 Gas，本地估算不再可信
+            self._reset_balance_estimate()
+            return False
+
+        try:
+            self._record_receipt(receipt)
+        except Exception as e:
+            logger.warning(f"[警告] 余额估算更新失败: {str(e)}")
+            self._reset_balance_estimate()
+
+        if receipt.status == 1:
+            logger.info(f"[交易确认] 交易已确认 Block: {receipt.blockNumber}")
+            return True
+        logger.error(f"[交易失败] 交易失败: {receipt.transactionHash.hex()}")
+        return False
\ No newline at end of file
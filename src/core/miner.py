@@ -4,6 +4,7 @@ from typing import Optional, Tuple
 from web3.exceptions import TransactionNotFound
 from src.logging_config import setup_logger
 from src.utils.hashing import MiningSession
+from src.utils.tracing import export_all, span, start_exporter, traced
 from .blockchain import BlockchainClient
 
 logger = setup_logger(__name__)
@@ -17,9 +18,13 @@ current_task: Optional[Tuple[int, int]] = None  # (nonce, difficulty)
 _last_mining_session: Optional[MiningSession] = None
 
 
+@traced()
 def check_balances(client: BlockchainClient) -> bool:
     try:
         wallet_balance = client.get_balance()
+        if wallet_balance < MIN_WALLET_BALANCE:
+            # 本地估算值偏低，判定不足前以链上余额为准
+            wallet_balance = client.get_balance(fresh=True)
         contract_balance = client.get_contract_balance()
 
         if wallet_balance < MIN_WALLET_BALANCE:
@@ -36,6 +41,7 @@ def check_balances(client: BlockchainClient) -> bool:
         return False
 
 
+@traced()
 def request_task_with_retry(client: BlockchainClient, max_retries: int = 5) -> Optional[Tuple[int, int]]:
     for attempt in range(max_retries):
         try:
@@ -72,6 +78,7 @@ def request_task_with_retry(client: BlockchainClient, max_retries: int = 5) -> O
     return None
 
 
+@traced()
 def mine_current_task(client: BlockchainClient) -> Optional[int]:
     global _last_mining_session
     if not current_task:
@@ -101,6 +108,7 @@ def get_current_hashrate() -> float:
     return 0.0
 
 
+@traced()
 def submit_solution(client: BlockchainClient, solution: int) -> bool:
     logger.info(f"提交方案: {solution:#x}")
 
@@ -120,35 +128,47 @@ def submit_solution(client: BlockchainClient, solution: int) -> bool:
         return False
 
 
-def run_mining_process(client: BlockchainClient):
+def _run_mining_round(client: BlockchainClient):
+    """执行一轮：余额检查 -> 请求任务 -> 挖矿 -> 提交"""
     global current_task
 
-    logger.info("======= 小原酱世界第一可爱 =======")
+    if not check_balances(client):
+        logger.warning("余额不足，等待5秒后重试...")
+        time.sleep(5)
+        return
 
-    while True:
-        try:
-            if not check_balances(client):
-                logger.warning("余额不足，等待5秒后重试...")
-                time.sleep(5)
-                continue
+    task = request_task_with_retry(client)
+    if task is None:
+        logger.warning("无法获取任务，等待5秒后重试...")
+        time.sleep(5)
+        return
 
-            task = request_task_with_retry(client)
-            if task is None:
-                logger.warning("无法获取任务，等待5秒后重试...")
-                time.sleep(5)
-                continue
+    current_task = task
 
-            current_task = task
+    solution = mine_current_task(client)
+    if solution is None:
+        logger.warning("本轮挖矿无结果，重新开始...")
+        return
 
-            solution = mine_current_task(client)
-            if solution is None:
-                logger.warning("本轮挖矿无结果，重新开始...")
-                continue
+    if submit_solution(client, solution):
+        current_task = None
 
-            if submit_solution(client, solution):
-                current_task = None
 
+def run_mining_process(client: BlockchainClient):
+    logger.info("======= 小原酱世界第一可爱 =======")
+    # 定时 + 退出时导出追踪数据，长时间卡住的轮次也能看到已完成的子 span
+    start_exporter()
+
+    round_index = 0
+    while True:
+        round_index += 1
+        try:
+            with span("mining_round", round=round_index):
+                _run_mining_round(client)
         except Exception as e:
             logger.critical(f"炸了: {str(e)}", exc_info=True)
             logger.info("5秒后自动重启...")
             time.sleep(5)
+        finally:
+            # 每轮结束后落盘，方便随时打开查看（导出失败只记录日志，不影响挖矿）
+            export_all()
@@ -0,0 +1,228 @@
+import itertools
+import os
+import threading
+import time
+from typing import List, Optional
+from src.logging_config import setup_logger
+
+logger = setup_logger(__name__)
+
+# 以下配置在调用时读取，确保 cli.main() 中 load_dotenv() 加载的 .env 生效
+
+def _miner_workers() -> int:
+    """挖矿线程数（不填则自动按物理核心 / cgroup 配额计算）"""
+    return int(os.getenv("MINER_WORKERS") or 0)
+
+
+def _reserved_cores() -> int:
+    """预留给 RPC / 主控线程的核心数"""
+    return int(os.getenv("MINER_RESERVED_CORES") or 1)
+
+
+def _cpu_limit() -> float:
+    """CPU 占用上限（百分比），100 表示不限速"""
+    return float(os.getenv("MINER_CPU_LIMIT") or 100)
+
+
+def _pin_cores() -> bool:
+    """是否将挖矿线程绑定到物理核心"""
+    return os.getenv("MINER_PIN_CORES", "true").lower() == "true"
+
+
+def _available_cpus() -> List[int]:
+    """当前进程允许使用的逻辑CPU"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _self_cgroup_dirs(root: str, controller: Optional[str] = None) -> List[str]:
+    """
+    本进程所在 cgroup 目录及其各级父目录（从自身到根）
+
+    controller 为 None 时查找 cgroup v2 的 "0::/<path>" 行，否则查找 v1 中包含该控制器的行。
+    未开启私有 cgroup 命名空间时（systemd 服务、部分容器运行时），配额写在进程自己的目录里。
+    """
+    rel = "/"
+    try:
+        with open("/proc/self/cgroup") as f:
+            for line in f:
+                _, controllers, path = line.strip().split(":", 2)
+                if (controller is None and controllers == "") or controller in controllers.split(","):
+                    rel = path
+                    break
+    except (OSError, ValueError):
+        pass
+
+    parts = [p for p in rel.split("/") if p]
+    return [os.path.join(root, *parts[:i]) for i in range(len(parts), -1, -1)]
+
+
+def _cgroup_cpu_quota() -> Optional[float]:
+    """读取容器 cgroup 的CPU配额（单位：核，取各级 cgroup 中最小的），无限制时返回 None"""
+    quotas = []
+    found_v2 = False
+    for cgroup_dir in _self_cgroup_dirs("/sys/fs/cgroup"):
+        try:
+            # cgroup v2: "<quota> <period>" 或 "max <period>"
+            with open(f"{cgroup_dir}/cpu.max") as f:
+                quota, period = f.read().split()[:2]
+        except (OSError, ValueError):
+            continue
+        found_v2 = True
+        if quota != "max" and int(period) > 0:
+            quotas.append(int(quota) / int(period))
+    if found_v2:
+        return min(quotas) if quotas else None
+
+    for cgroup_dir in _self_cgroup_dirs("/sys/fs/cgroup/cpu", "cpu"):
+        try:
+            # cgroup v1
+            with open(f"{cgroup_dir}/cpu.cfs_quota_us") as f:
+                quota = int(f.read())
+            with open(f"{cgroup_dir}/cpu.cfs_period_us") as f:
+                period = int(f.read())
+        except (OSError, ValueError):
+            continue
+        if quota > 0 and period > 0:
+            quotas.append(quota / period)
+    return min(quotas) if quotas else None
+
+
+def _physical_cores(cpus: List[int]) -> List[int]:
+    """每个物理核心只保留一个逻辑CPU（跳过超线程兄弟）"""
+    seen = set()
+    cores = []
+    for cpu in cpus:
+        path = f"/sys/devices/system/cpu/cpu{cpu}/topology/thread_siblings_list"
+        try:
+            with open(path) as f:
+                siblings = f.read().strip()
+        except OSError:
+            # 无拓扑信息（非Linux等），按独立核心处理
+            siblings = str(cpu)
+        if siblings not in seen:
+            seen.add(siblings)
+            cores.append(cpu)
+    return cores
+
+
+def plan_worker_cpus() -> List[int]:
+    """
+    规划挖矿线程使用的CPU
+
+    Returns:
+        List[int]: 每个挖矿线程对应的逻辑CPU编号，长度即线程数
+    """
+    reserved = _reserved_cores()
+    workers = _miner_workers()
+    cpus = _available_cpus()
+    cores = _physical_cores(cpus)
+
+    count = len(cores)
+    quota = _cgroup_cpu_quota()
+    if quota is not None:
+        count = min(count, max(int(quota), 1))
+
+    # 预留核心给 I/O，但至少保留一个挖矿线程
+    count = max(count - reserved, 1)
+
+    if workers > 0:
+        count = workers
+        if quota is not None and workers > max(int(quota), 1):
+            # 显式指定的线程数同样受容器配额限制
+            count = max(int(quota), 1)
+            logger.warning(f"[警告] MINER_WORKERS={workers} 超过容器CPU配额 {quota:g} 核，已限制为 {count} 个线程")
+
+    # 预留的是靠前的核心（主线程通常在 CPU0 上处理中断和 I/O）
+    usable = cores[reserved:] or cores
+    return [usable[i % len(usable)] for i in range(count)]
+
+
+def make_worker_initializer(cpus: List[int]):
+    """返回线程池 initializer，依次把每个工作线程绑定到一个CPU"""
+    slots = itertools.count()
+    pin = _pin_cores()
+
+    def initializer():
+        if not pin or not hasattr(os, "sched_setaffinity"):
+            return
+        cpu = cpus[next(slots) % len(cpus)]
+        try:
+            # Linux 下 pid=0 表示当前线程
+            os.sched_setaffinity(0, {cpu})
+        except OSError:
+            pass
+
+    return initializer
+
+
+class DutyCycleThrottle:
+    """
+    占空比限速：整个线程池共用一个闸门，挖矿只在 MINER_CPU_LIMIT% 的时间内全速运行
+
+    控制线程每个周期先开闸 WINDOW 秒，用进程CPU时间（time.process_time()）测出全速时的占用，
+    然后关闸，直到本周期的进程CPU占用（含关闸后仍在收尾的分块）降到全速占用 × 目标比例以下。
+    工作线程在每个分块前调用 wait()，关闸期间所有线程一起暂停。
+    """
+
+    WINDOW = 0.1
+
+    def __init__(self, limit_percent: Optional[float] = None):
+        if limit_percent is None:
+            limit_percent = _cpu_limit()
+        self.ratio = min(max(limit_percent, 1.0), 100.0) / 100.0
+        self.enabled = self.ratio < 1.0
+        self._gate = threading.Event()
+        self._gate.set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="cpu-throttle", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._gate.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def wait(self):
+        """工作线程在每个分块前调用，关闸期间阻塞"""
+        if self.enabled:
+            self._gate.wait()
+
+    def _run(self):
+        while not self._stop.is_set():
+            start_wall = time.perf_counter()
+            start_cpu = time.process_time()
+            self._gate.set()
+            if self._stop.wait(self.WINDOW):
+                break
+            self._gate.clear()
+
+            full_rate = (time.process_time() - start_cpu) / (time.perf_counter() - start_wall)
+            if full_rate <= 0:
+                continue
+            target_rate = full_rate * self.ratio
+            while not self._stop.is_set():
+                used = time.process_time() - start_cpu
+                elapsed = time.perf_counter() - start_wall
+                remaining = used / target_rate - elapsed
+                if remaining <= 0:
+                    break
+                self._stop.wait(min(remaining, self.WINDOW))
+        self._gate.set()
@@ -6,7 +6,8 @@ from concurrent.futures import ThreadPoolExecutor
 import sys
 import threading
 import itertools
-import os
+from src.utils.cpu import DutyCycleThrottle, make_worker_initializer, plan_worker_cpus
+from src.utils.tracing import sampling_profiler, traced
 
 
 class MiningSession:
@@ -51,13 +52,17 @@ class MiningSession:
             sys.stdout.write(f"\r当前算力: {hashrate:,.0f} H/s | 尝试数: {total_count:,}")
             sys.stdout.flush()
 
+    @traced()
     def find_solution(self, start: int, end: int) -> Optional[Tuple[int, float]]:
         """带统计的解决方案搜索"""
         print(f"开始搜索范围 {start}-{end}")
         
         # 优化区块大小：每个区块1000个数字
         CHUNK_SIZE = 1000
-        cpu_count = os.cpu_count() or 1
+        # 按物理核心 / cgroup 配额规划线程，并预留核心给 I/O
+        worker_cpus = plan_worker_cpus()
+        cpu_count = len(worker_cpus)
+        throttle = DutyCycleThrottle()
         
         # 停止标志
         solution_found = threading.Event()
@@ -65,6 +70,7 @@ class MiningSession:
         def process_chunk(chunk_start: int) -> Optional[int]:
             if solution_found.is_set():
                 return None
+            throttle.wait()
             result = self._calculate_chunk(chunk_start, CHUNK_SIZE)
             if result is not None:
                 solution_found.set()
@@ -81,7 +87,9 @@ class MiningSession:
         monitor.start()
 
         try:
-            with ThreadPoolExecutor(max_workers=cpu_count) as executor:
+            with ThreadPoolExecutor(max_workers=cpu_count,
+                                    initializer=make_worker_initializer(worker_cpus)) as executor, \
+                    throttle, sampling_profiler():
                 current = start
                 while current < end and not solution_found.is_set():
                     # 提交一批任务
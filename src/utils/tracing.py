@@ -0,0 +1,253 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque, namedtuple
+from contextlib import contextmanager
+from typing import Optional
+from src.logging_config import setup_logger
+
+logger = setup_logger(__name__)
+
+# 内存中最多保留的未导出事件数，超出后丢弃最早的
+MAX_TRACE_EVENTS = 200_000
+# 后台导出间隔（秒），卡住的轮次中已结束的子 span 也能及时落盘
+TRACE_FLUSH_INTERVAL = 5.0
+
+TraceSettings = namedtuple("TraceSettings", ["trace_file", "profile_file", "profile_hz"])
+
+_events = deque(maxlen=MAX_TRACE_EVENTS)
+_stack_counts = Counter()
+_export_lock = threading.Lock()
+_trace_file_opened: Optional[str] = None
+_exporter_started = False
+_exporter_stop = threading.Event()
+_pid = os.getpid()
+
+
+@functools.lru_cache(maxsize=None)
+def settings() -> TraceSettings:
+    """
+    读取追踪配置（首次调用时读取，晚于 cli.main() 中的 load_dotenv()）
+
+    - MINER_TRACE_FILE: Chrome trace 输出文件（chrome://tracing 或 Perfetto 打开），不填则关闭追踪
+    - MINER_PROFILE_FILE: 挖矿线程采样输出文件（折叠栈格式，可直接喂给 flamegraph.pl / speedscope），不填则关闭采样
+    - MINER_PROFILE_HZ: 采样频率（次/秒）
+    """
+    return TraceSettings(
+        trace_file=os.getenv("MINER_TRACE_FILE", ""),
+        profile_file=os.getenv("MINER_PROFILE_FILE", ""),
+        profile_hz=float(os.getenv("MINER_PROFILE_HZ") or 100),
+    )
+
+
+def trace_enabled() -> bool:
+    return bool(settings().trace_file)
+
+
+def profile_enabled() -> bool:
+    return bool(settings().profile_file)
+
+
+def _now_us() -> float:
+    return time.perf_counter_ns() / 1000
+
+
+class _NullSpan:
+    """关闭追踪时使用的空上下文，几乎无开销"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name: str, args: dict):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = _now_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = _now_us()
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        # "X" 为完整事件，同一线程内按时间区间自动嵌套
+        _events.append({
+            "name": self.name,
+            "ph": "X",
+            "ts": self.start,
+            "dur": end - self.start,
+            "pid": _pid,
+            "tid": threading.get_ident(),
+            "args": self.args,
+        })
+        return False
+
+
+def span(name: str, **args):
+    """记录一段耗时，用法: with span("find_solution"): ..."""
+    if not trace_enabled():
+        return _NULL_SPAN
+    return _Span(name, args)
+
+
+def traced(name: Optional[str] = None):
+    """为函数 / 方法添加追踪的装饰器，默认以 __qualname__ 命名"""
+
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not trace_enabled():
+                return func(*args, **kwargs)
+            with _Span(span_name, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def rpc_trace_middleware(make_request, w3):
+    """web3 中间件：把每次 RPC 请求记录为子 span"""
+
+    def middleware(method, params):
+        with _Span(f"rpc:{method}", {}):
+            return make_request(method, params)
+
+    return middleware
+
+
+def export_chrome_trace(path: Optional[str] = None):
+    """
+    把新产生的事件追加到 Chrome trace-event 文件
+
+    使用 JSON 数组格式（Chrome / Perfetto 允许省略结尾的 "]"），
+    每次只写入上次导出之后的事件，不重写整个文件。写入失败只记录日志。
+    """
+    global _trace_file_opened
+    path = path or settings().trace_file
+    if not path:
+        return
+    with _export_lock:
+        events = []
+        while _events:
+            events.append(_events.popleft())
+        try:
+            # 本进程首次写入该文件时覆盖旧内容
+            mode = "a" if _trace_file_opened == path else "w"
+            with open(path, mode, encoding="utf-8") as f:
+                if mode == "w":
+                    f.write("[\n")
+                for event in events:
+                    f.write(json.dumps(event))
+                    f.write(",\n")
+            _trace_file_opened = path
+        except OSError as e:
+            logger.error(f"[错误] 追踪数据导出失败: {str(e)}")
+
+
+def export_flame(path: Optional[str] = None):
+    """导出采样结果（折叠栈格式：每行 "帧1;帧2;帧3 次数"），写入失败只记录日志"""
+    path = path or settings().profile_file
+    if not path:
+        return
+    with _export_lock:
+        try:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for stack, count in _stack_counts.most_common():
+                    f.write(f"{stack} {count}\n")
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"[错误] 采样数据导出失败: {str(e)}")
+
+
+def export_all():
+    """导出已开启的追踪 / 采样数据，未开启时不做任何事"""
+    if trace_enabled():
+        export_chrome_trace()
+    if profile_enabled():
+        export_flame()
+
+
+def start_exporter(interval: float = TRACE_FLUSH_INTERVAL):
+    """
+    启动后台定时导出线程，并注册进程退出时的最后一次导出
+
+    挖矿线程是守护线程，按 esc / Ctrl+C 退出时不会走到轮次结束后的导出。
+    未开启追踪 / 采样时不做任何事，重复调用只启动一次。
+    """
+    global _exporter_started, _exporter_stop
+    if _exporter_started or not (trace_enabled() or profile_enabled()):
+        return
+    _exporter_started = True
+    # 每次启动使用新的停止事件，避免旧线程错过 stop_exporter() 的信号
+    stop = _exporter_stop = threading.Event()
+    atexit.register(export_all)
+
+    def exporter():
+        while not stop.wait(interval):
+            export_all()
+
+    threading.Thread(target=exporter, name="trace-exporter", daemon=True).start()
+
+
+def stop_exporter():
+    """停止后台导出线程（不做最后一次导出）"""
+    global _exporter_started
+    _exporter_stop.set()
+    _exporter_started = False
+
+
+def _fold_stack(frame) -> str:
+    frames = []
+    while frame is not None:
+        code = frame.f_code
+        frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(frames))
+
+
+@contextmanager
+def sampling_profiler(thread_prefix: str = "ThreadPoolExecutor"):
+    """
+    对名称以 thread_prefix 开头的线程（即挖矿线程）做周期性栈采样
+
+    未设置 MINER_PROFILE_FILE 时不启动采样线程
+    """
+    if not profile_enabled():
+        yield
+        return
+
+    stop = threading.Event()
+    interval = 1.0 / max(settings().profile_hz, 1.0)
+
+    def sampler():
+        while not stop.wait(interval):
+            targets = {t.ident for t in threading.enumerate() if t.name.startswith(thread_prefix)}
+            for ident, frame in sys._current_frames().items():
+                if ident in targets:
+                    _stack_counts[_fold_stack(frame)] += 1
+
+    thread = threading.Thread(target=sampler, name="trace-sampler", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join(timeout=1)
@@ -0,0 +1,150 @@
+from decimal import Decimal
+
+import pytest
+from web3 import Web3
+from web3.datastructures import AttributeDict
+
+from src.core.blockchain import DEFAULT_BALANCE_REFRESH_TXS, BlockchainClient
+from src.core.miner import check_balances
+
+ADDRESS = "0x000000000000000000000000000000000000dEaD"
+GWEI = 10 ** 9
+
+
+class FakeEth:
+    def __init__(self, balance_wei: int):
+        self.balance_wei = balance_wei
+        self.balance_calls = 0
+        self.receipts = []
+
+    def get_balance(self, address):
+        self.balance_calls += 1
+        return self.balance_wei
+
+    def wait_for_transaction_receipt(self, tx_hash, timeout=120):
+        receipt = self.receipts.pop(0)
+        if isinstance(receipt, Exception):
+            raise receipt
+        return receipt
+
+
+class FakeWeb3:
+    def __init__(self, balance_wei: int):
+        self.eth = FakeEth(balance_wei)
+
+    @staticmethod
+    def from_wei(value, unit):
+        return Web3.from_wei(value, unit)
+
+
+def _receipt(block: int, gas_used: int = 100_000, gas_price=GWEI, status: int = 1):
+    fields = {
+        "blockNumber": block,
+        "gasUsed": gas_used,
+        "status": status,
+        "transactionHash": bytes(32),
+    }
+    if gas_price is not None:
+        fields["effectiveGasPrice"] = gas_price
+    return AttributeDict(fields)
+
+
+@pytest.fixture
+def client():
+    # 跳过 __init__ 中的 RPC 连接，只初始化余额估算相关状态
+    client = BlockchainClient.__new__(BlockchainClient)
+    client.w3 = FakeWeb3(Web3.to_wei(1, "ether"))
+    client.account = AttributeDict({"address": ADDRESS})
+    client.balance_refresh_txs = 4
+    client._reset_balance_estimate()
+    return client
+
+
+def _confirm(client, receipt):
+    client.w3.eth.receipts.append(receipt)
+    return client.wait_for_transaction("0x00")
+
+
+def test_balance_estimate_subtracts_gas(client):
+    assert client.get_balance() == Decimal(1)
+    assert _confirm(client, _receipt(100))
+    assert _confirm(client, _receipt(101, gas_used=200_000, gas_price=2 * GWEI))
+
+    expected = Web3.from_wei(Web3.to_wei(1, "ether") - 100_000 * GWEI - 400_000 * GWEI, "ether")
+    assert client.get_balance() == expected
+    assert client.w3.eth.balance_calls == 1
+
+
+def test_failed_transaction_still_costs_gas(client):
+    client.get_balance()
+    assert not _confirm(client, _receipt(100, status=0))
+    assert client.get_balance() == Web3.from_wei(Web3.to_wei(1, "ether") - 100_000 * GWEI, "ether")
+
+
+def test_balance_refreshes_after_threshold(client):
+    client.get_balance()
+    for block in range(100, 103):
+        _confirm(client, _receipt(block))
+    client.get_balance()
+    assert client.w3.eth.balance_calls == 1
+
+    _confirm(client, _receipt(103))
+    assert client.get_balance() == Decimal(1)
+    assert client.w3.eth.balance_calls == 2
+
+
+def test_default_saves_balance_reads_per_round(client):
+    client.balance_refresh_txs = DEFAULT_BALANCE_REFRESH_TXS
+    client.get_contract_balance = lambda: Decimal(100)
+
+    # 每轮：余额检查 -> 任务请求交易 -> 提交交易
+    for round_index in range(10):
+        assert check_balances(client)
+        _confirm(client, _receipt(100 + 2 * round_index))
+        _confirm(client, _receipt(101 + 2 * round_index))
+
+    # 基线每轮查询一次链上余额（10 次），默认配置下每 5 轮才查询一次
+    assert client.w3.eth.balance_calls == 2
+
+
+def test_low_estimate_rechecks_chain(client, monkeypatch):
+    client.get_contract_balance = lambda: Decimal(100)
+    client.w3.eth.balance_wei = Web3.to_wei(0.1, "ether") + 100_000 * GWEI
+    assert check_balances(client)
+    _confirm(client, _receipt(100))
+
+    # 估算值低于阈值，但链上余额因挖矿奖励已增加
+    client.w3.eth.balance_wei = Web3.to_wei(1, "ether")
+    assert check_balances(client)
+    assert client.w3.eth.balance_calls == 2
+
+
+def test_fresh_bypasses_estimate(client):
+    client.get_balance()
+    _confirm(client, _receipt(100))
+    assert client.get_balance(fresh=True) == Decimal(1)
+    assert client.w3.eth.balance_calls == 2
+
+
+def test_refresh_disabled(client):
+    client.balance_refresh_txs = 0
+    client.get_balance()
+    client.get_balance()
+    assert client.w3.eth.balance_calls == 2
+
+
+def test_wait_failure_discards_estimate(client):
+    client.get_balance()
+    client.w3.eth.receipts.append(TimeoutError("timeout"))
+    assert not client.wait_for_transaction("0x00")
+
+    client.get_balance()
+    assert client.w3.eth.balance_calls == 2
+
+
+def test_missing_gas_price_discards_estimate_but_confirms(client):
+    client.get_balance()
+    assert _confirm(client, _receipt(100, gas_price=None))
+
+    client.get_balance()
+    assert client.w3.eth.balance_calls == 2
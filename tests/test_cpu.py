@@ -0,0 +1,175 @@
+import io
+import threading
+import time
+
+import pytest
+
+from src.utils import cpu
+
+
+def _fake_open(files):
+    def fake_open(path, *args, **kwargs):
+        if path not in files:
+            raise FileNotFoundError(path)
+        return io.StringIO(files[path])
+    return fake_open
+
+
+@pytest.fixture(autouse=True)
+def clean_env(monkeypatch):
+    for name in ("MINER_WORKERS", "MINER_RESERVED_CORES", "MINER_CPU_LIMIT", "MINER_PIN_CORES"):
+        monkeypatch.delenv(name, raising=False)
+
+
+@pytest.fixture
+def machine(monkeypatch):
+    """模拟一台机器：cpus 为可用逻辑CPU，siblings 为超线程分组，quota 为 cgroup 配额"""
+    def setup(cpus, siblings=None, quota=None):
+        files = {}
+        for group in siblings or [[c] for c in cpus]:
+            for c in group:
+                files[f"/sys/devices/system/cpu/cpu{c}/topology/thread_siblings_list"] = ",".join(map(str, group))
+        if quota is not None:
+            files["/sys/fs/cgroup/cpu.max"] = quota
+        monkeypatch.setattr(cpu, "open", _fake_open(files), raising=False)
+        monkeypatch.setattr(cpu, "_available_cpus", lambda: list(cpus))
+    return setup
+
+
+def test_cgroup_v2_quota(monkeypatch):
+    monkeypatch.setattr(cpu, "open", _fake_open({"/sys/fs/cgroup/cpu.max": "250000 100000\n"}), raising=False)
+    assert cpu._cgroup_cpu_quota() == 2.5
+
+
+def test_cgroup_v2_unlimited(monkeypatch):
+    monkeypatch.setattr(cpu, "open", _fake_open({"/sys/fs/cgroup/cpu.max": "max 100000\n"}), raising=False)
+    assert cpu._cgroup_cpu_quota() is None
+
+
+def test_cgroup_v1_quota(monkeypatch):
+    files = {
+        "/sys/fs/cgroup/cpu/cpu.cfs_quota_us": "150000\n",
+        "/sys/fs/cgroup/cpu/cpu.cfs_period_us": "100000\n",
+    }
+    monkeypatch.setattr(cpu, "open", _fake_open(files), raising=False)
+    assert cpu._cgroup_cpu_quota() == 1.5
+
+
+def test_cgroup_v1_unlimited(monkeypatch):
+    files = {
+        "/sys/fs/cgroup/cpu/cpu.cfs_quota_us": "-1\n",
+        "/sys/fs/cgroup/cpu/cpu.cfs_period_us": "100000\n",
+    }
+    monkeypatch.setattr(cpu, "open", _fake_open(files), raising=False)
+    assert cpu._cgroup_cpu_quota() is None
+
+
+def test_no_cgroup(monkeypatch):
+    monkeypatch.setattr(cpu, "open", _fake_open({}), raising=False)
+    assert cpu._cgroup_cpu_quota() is None
+
+
+def test_plan_skips_smt_siblings_and_reserves_core(machine):
+    machine(range(8), siblings=[[0, 4], [1, 5], [2, 6], [3, 7]])
+    assert cpu.plan_worker_cpus() == [1, 2, 3]
+
+
+def test_plan_clamps_to_cgroup_quota(machine):
+    machine(range(8), quota="300000 100000")
+    assert cpu.plan_worker_cpus() == [1, 2]
+
+
+def test_plan_reserved_cores_from_env(machine, monkeypatch):
+    machine(range(4))
+    monkeypatch.setenv("MINER_RESERVED_CORES", "0")
+    assert cpu.plan_worker_cpus() == [0, 1, 2, 3]
+    monkeypatch.setenv("MINER_RESERVED_CORES", "2")
+    assert cpu.plan_worker_cpus() == [2, 3]
+
+
+def test_plan_workers_override(machine, monkeypatch):
+    machine(range(4))
+    monkeypatch.setenv("MINER_WORKERS", "5")
+    assert cpu.plan_worker_cpus() == [1, 2, 3, 1, 2]
+
+
+def test_plan_single_cpu(machine):
+    machine([0])
+    assert cpu.plan_worker_cpus() == [0]
+
+
+def test_cgroup_v2_own_cgroup(monkeypatch):
+    files = {
+        "/proc/self/cgroup": "0::/system.slice/miner.service\n",
+        "/sys/fs/cgroup/system.slice/miner.service/cpu.max": "200000 100000\n",
+        "/sys/fs/cgroup/system.slice/cpu.max": "max 100000\n",
+        "/sys/fs/cgroup/cpu.max": "max 100000\n",
+    }
+    monkeypatch.setattr(cpu, "open", _fake_open(files), raising=False)
+    assert cpu._cgroup_cpu_quota() == 2.0
+
+
+def test_cgroup_v2_parent_limit_applies(monkeypatch):
+    files = {
+        "/proc/self/cgroup": "0::/system.slice/miner.service\n",
+        "/sys/fs/cgroup/system.slice/miner.service/cpu.max": "400000 100000\n",
+        "/sys/fs/cgroup/system.slice/cpu.max": "150000 100000\n",
+    }
+    monkeypatch.setattr(cpu, "open", _fake_open(files), raising=False)
+    assert cpu._cgroup_cpu_quota() == 1.5
+
+
+def test_cgroup_v1_own_cgroup(monkeypatch):
+    files = {
+        "/proc/self/cgroup": "4:memory:/docker/abc\n3:cpu,cpuacct:/docker/abc\n",
+        "/sys/fs/cgroup/cpu/docker/abc/cpu.cfs_quota_us": "50000\n",
+        "/sys/fs/cgroup/cpu/docker/abc/cpu.cfs_period_us": "100000\n",
+    }
+    monkeypatch.setattr(cpu, "open", _fake_open(files), raising=False)
+    assert cpu._cgroup_cpu_quota() == 0.5
+
+
+def test_plan_workers_override_clamped_to_quota(machine, monkeypatch):
+    machine(range(8), quota="300000 100000")
+    monkeypatch.setenv("MINER_WORKERS", "8")
+    assert cpu.plan_worker_cpus() == [1, 2, 3]
+
+
+def test_throttle_disabled_by_default():
+    throttle = cpu.DutyCycleThrottle()
+    assert not throttle.enabled
+    with throttle:
+        throttle.wait()
+    assert throttle._thread is None
+
+
+def _pool_cpu_rate(throttle, workers=4, duration=1.5):
+    """多个工作线程跑纯 Python 计算，返回进程CPU占用（核）"""
+    stop = threading.Event()
+
+    def worker():
+        while not stop.is_set():
+            throttle.wait()
+            sum(i * i for i in range(2000))
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    with throttle:
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        for t in threads:
+            t.start()
+        time.sleep(duration)
+        used = time.process_time() - start_cpu
+        elapsed = time.perf_counter() - start_wall
+        stop.set()
+    for t in threads:
+        t.join()
+    return used / elapsed
+
+
+def test_throttle_caps_pool_cpu():
+    full = _pool_cpu_rate(cpu.DutyCycleThrottle(100))
+    throttled = _pool_cpu_rate(cpu.DutyCycleThrottle(50))
+    assert throttled / full == pytest.approx(0.5, abs=0.15)
+
+    throttled = _pool_cpu_rate(cpu.DutyCycleThrottle(25))
+    assert throttled / full == pytest.approx(0.25, abs=0.12)
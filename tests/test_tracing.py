@@ -0,0 +1,147 @@
+import json
+import time
+
+import pytest
+
+from src.utils import tracing
+
+
+@pytest.fixture
+def configure(monkeypatch):
+    """设置追踪相关环境变量并清空缓冲区"""
+    def setup(trace_file="", profile_file=""):
+        monkeypatch.setenv("MINER_TRACE_FILE", str(trace_file))
+        monkeypatch.setenv("MINER_PROFILE_FILE", str(profile_file))
+        tracing.settings.cache_clear()
+        tracing._events.clear()
+        tracing._stack_counts.clear()
+        monkeypatch.setattr(tracing, "_trace_file_opened", None)
+        monkeypatch.setattr(tracing, "_exporter_started", False)
+    yield setup
+    tracing.stop_exporter()
+    tracing.settings.cache_clear()
+    tracing._events.clear()
+    tracing._stack_counts.clear()
+
+
+def _load_trace(path):
+    # 与 Chrome 一样容忍省略结尾的 "]"
+    return json.loads(path.read_text(encoding="utf-8").rstrip().rstrip(",") + "]")
+
+
+def test_disabled_is_noop(configure):
+    configure()
+
+    @tracing.traced()
+    def work():
+        with tracing.span("inner"):
+            return 42
+
+    assert tracing.span("x") is tracing._NULL_SPAN
+    assert work() == 42
+    assert len(tracing._events) == 0
+
+
+def test_spans_nest(configure, tmp_path):
+    configure(trace_file=tmp_path / "trace.json")
+
+    @tracing.traced()
+    def outer():
+        with tracing.span("inner", attempt=1):
+            tracing.rpc_trace_middleware(lambda method, params: "ok", None)("eth_call", [])
+
+    outer()
+
+    events = {e["name"]: e for e in tracing._events}
+    assert set(events) == {"inner", "rpc:eth_call", "test_spans_nest.<locals>.outer"}
+    assert events["inner"]["args"] == {"attempt": 1}
+
+    def contains(parent, child):
+        return parent["ts"] <= child["ts"] and child["ts"] + child["dur"] <= parent["ts"] + parent["dur"]
+
+    assert contains(events["test_spans_nest.<locals>.outer"], events["inner"])
+    assert contains(events["inner"], events["rpc:eth_call"])
+
+
+def test_span_records_error(configure, tmp_path):
+    configure(trace_file=tmp_path / "trace.json")
+
+    with pytest.raises(ValueError):
+        with tracing.span("boom"):
+            raise ValueError()
+
+    assert tracing._events[0]["args"] == {"error": "ValueError"}
+
+
+def test_export_chrome_trace_appends(configure, tmp_path):
+    path = tmp_path / "trace.json"
+    path.write_text("旧内容", encoding="utf-8")
+    configure(trace_file=path)
+
+    with tracing.span("first"):
+        pass
+    tracing.export_all()
+    with tracing.span("second"):
+        pass
+    tracing.export_all()
+
+    assert [e["name"] for e in _load_trace(path)] == ["first", "second"]
+    assert len(tracing._events) == 0
+
+
+def test_export_errors_are_logged(configure, tmp_path, monkeypatch):
+    configure(trace_file=tmp_path / "missing" / "trace.json",
+              profile_file=tmp_path / "missing" / "profile.folded")
+    errors = []
+    monkeypatch.setattr(tracing.logger, "error", errors.append)
+
+    with tracing.span("round"):
+        pass
+    tracing._stack_counts["a;b"] += 1
+    tracing.export_all()
+
+    assert len(errors) == 2
+    assert "追踪数据导出失败" in errors[0]
+    assert "采样数据导出失败" in errors[1]
+    assert len(tracing._events) == 0
+
+
+def test_export_flame(configure, tmp_path):
+    path = tmp_path / "profile.folded"
+    configure(profile_file=path)
+    tracing._stack_counts["main;work"] += 3
+    tracing._stack_counts["main;idle"] += 1
+
+    tracing.export_all()
+
+    assert path.read_text(encoding="utf-8") == "main;work 3\nmain;idle 1\n"
+
+
+def test_exporter_flushes_during_round_and_at_exit(configure, tmp_path, monkeypatch):
+    path = tmp_path / "trace.json"
+    configure(trace_file=path)
+    exit_hooks = []
+    monkeypatch.setattr(tracing.atexit, "register", exit_hooks.append)
+
+    tracing.start_exporter(interval=0.05)
+    tracing.start_exporter(interval=0.05)
+    assert exit_hooks == [tracing.export_all]
+
+    # 外层轮次尚未结束，已完成的子 span 应被后台线程导出
+    with tracing.span("mining_round"):
+        with tracing.span("wait_for_transaction"):
+            pass
+        deadline = time.time() + 2
+        while not path.exists() and time.time() < deadline:
+            time.sleep(0.01)
+        assert [e["name"] for e in _load_trace(path)] == ["wait_for_transaction"]
+
+    exit_hooks[0]()
+    assert [e["name"] for e in _load_trace(path)] == ["wait_for_transaction", "mining_round"]
+
+
+def test_exporter_disabled(configure, monkeypatch):
+    configure()
+    monkeypatch.setattr(tracing.atexit, "register", lambda f: pytest.fail("不应注册"))
+    tracing.start_exporter()
+    assert not tracing._exporter_started